@@ -0,0 +1,57 @@
+from lists import workload
+
+from optparse import OptionParser
+
+# Generates a forum workload, or replays a recorded trace, and reports
+# throughput, latency and round trips.
+#
+#   python bench.py --memory --ops 10000 --concurrency 8
+#   python bench.py --memory --record trace.jsonl
+#   python bench.py --keyspace liststest --replay trace.jsonl
+
+parser = OptionParser()
+parser.add_option("--keyspace", default="liststest")
+parser.add_option("--server", action="append", dest="servers",
+    help="host:port of a Cassandra node.  Repeat for more nodes.")
+parser.add_option("--memory", action="store_true", default=False,
+    help="run against the local in-memory stand-in")
+parser.add_option("--latency", type="float", default=0,
+    help="seconds the stand-in sleeps on every round trip")
+parser.add_option("--ops", type="int", default=1000)
+parser.add_option("--concurrency", type="int", default=1)
+parser.add_option("--lists", type="int", default=10)
+parser.add_option("--threads", type="int", default=100,
+    help="threads in each list")
+parser.add_option("--reads", type="float", default=0.8)
+parser.add_option("--writes", type="float", default=0.15)
+parser.add_option("--edits", type="float", default=0.05)
+parser.add_option("--list-views", type="float", default=0.5)
+parser.add_option("--skew", type="float", default=1.1)
+parser.add_option("--seed", type="int")
+parser.add_option("--record", help="write the operations to a trace file")
+parser.add_option("--replay", help="run the operations in a trace file")
+options, args = parser.parse_args()
+
+spec = workload.Workload(lists=options.lists, threads=options.threads,
+    reads=options.reads, writes=options.writes, edits=options.edits,
+    list_views=options.list_views, skew=options.skew, seed=options.seed)
+
+if options.replay:
+    with open(options.replay) as file:
+        ops = list(workload.replay(file))
+else:
+    ops = list(spec.operations(options.ops))
+
+if options.record:
+    with open(options.record, "w") as file:
+        workload.record(ops, file)
+
+kwargs = {}
+if options.servers:
+    kwargs['server_list'] = options.servers
+
+c, counter = workload.client(options.keyspace, options.memory,
+    options.latency, **kwargs)
+workload.prepare(c, ops)
+
+print workload.report(workload.run(c, ops, counter, options.concurrency))
@@ -49,3 +49,8 @@ print "threads"
 for thread in c.lists.threads(a_list):
     print '%s (%s)' % (thread, thread.message_updated_at)
 
+print
+
+print "thread previews"
+for thread, msgs in c.threads.previews(c.lists.threads(a_list), 2):
+    print '%s: %s' % (thread, ', '.join(str(msg) for msg in msgs))
@@ -3,21 +3,53 @@ import uuid
 from datetime import datetime
 
 import pycassa, re
+from pycassa import ConsistencyLevel
 from pycassa.pool import ConnectionPool
 from pycassa.columnfamily import ColumnFamily
 
 import entities
 
+# Read consistency level that reads at ONE, and only retries at the Client's
+# `fallback_consistency_level` when the result looks inconsistent.
+FAST_READ = 'FAST_READ'
+
 class Client(object):
 
-    def __init__(self, keyspace, **kwargs):
-        pool = ConnectionPool(keyspace, **kwargs)
-        lst_fam = ColumnFamily(pool, 'lists') 
-        th_fam = ColumnFamily(pool, 'threads') 
-        lst_threads_fam = ColumnFamily(pool, 'list_threads')
-        lst_msgs_fam = ColumnFamily(pool, 'list_messages')
-        th_msgs_fam = ColumnFamily(pool, 'thread_messages')
-        msgs_fam = ColumnFamily(pool, 'messages')
+    def __init__(self, keyspace, read_consistency_level=None,
+            write_consistency_level=None,
+            fallback_consistency_level=ConsistencyLevel.QUORUM, pool=None,
+            column_family=ColumnFamily, **kwargs):
+        """Connects to the given keyspace.
+
+        keyspace                   - The String keyspace name.
+        read_consistency_level     - Optional default read ConsistencyLevel
+                                     for every *Client, or FAST_READ.
+                                     Default: the pool's default.
+        write_consistency_level    - Optional default write ConsistencyLevel
+                                     for every *Client.  Default: the pool's
+                                     default.
+        fallback_consistency_level - The ConsistencyLevel used to retry
+                                     FAST_READ multigets.  Default: QUORUM.
+        pool                       - Optional pool to use instead of
+                                     connecting a new ConnectionPool.
+        column_family              - Function that builds a column family
+                                     from the pool and a String name.
+                                     Default: pycassa's ColumnFamily.
+        kwargs                     - Options passed to the ConnectionPool.
+        """
+
+        self.read_consistency_level = read_consistency_level
+        self.write_consistency_level = write_consistency_level
+        self.fallback_consistency_level = fallback_consistency_level
+
+        if pool is None:
+            pool = ConnectionPool(keyspace, **kwargs)
+        lst_fam = column_family(pool, 'lists') 
+        th_fam = column_family(pool, 'threads') 
+        lst_threads_fam = column_family(pool, 'list_threads')
+        lst_msgs_fam = column_family(pool, 'list_messages')
+        th_msgs_fam = column_family(pool, 'thread_messages')
+        msgs_fam = column_family(pool, 'messages')
 
         self.lists = ListClient(self, lst_fam, lst_threads_fam, lst_msgs_fam)
         self.threads = ThreadClient(self, th_fam, lst_threads_fam,
@@ -31,45 +63,64 @@ class ListClient(object):
 
     def __init__(self, client, lst_fam, lst_threads_fam, lst_msgs_fam):
         self.client = client
+        self.read_consistency_level = client.read_consistency_level
+        self.write_consistency_level = client.write_consistency_level
         self.column_fam = lst_fam
         self.lst_threads_fam = lst_threads_fam
         self.lst_msgs_fam = lst_msgs_fam
 
-    def threads(self, lst):
+    def threads(self, lst, read_consistency_level=None):
         """Public: Gets a range of Threads in a List.
         
-        lst - a lists.List instance.
+        lst                    - a lists.List instance.
+        read_consistency_level - Optional ConsistencyLevel or FAST_READ for
+                                 this call.  Default: the Client's
+                                 `read_consistency_level`.
        
         Returns an Array of lists.List instances.
         """
 
         lst = self.client.list(lst)
-        keys = get_unique_msg_keys(self.lst_threads_fam, lst.key)
-        return self.client.threads.multiget(keys)
+        level = read_level(self, read_consistency_level)
+        keys = get_unique_msg_keys(self.lst_threads_fam, lst.key,
+            read_consistency_level=level,
+            write_consistency_level=self.write_consistency_level)
+        return self.client.threads.multiget(keys, level)
 
-    def messages(self, lst):
+    def messages(self, lst, read_consistency_level=None):
         """Public: Gets a range of Messages in a List.
         
-        lst - a lists.List instance.
+        lst                    - a lists.List instance.
+        read_consistency_level - Optional ConsistencyLevel or FAST_READ for
+                                 this call.  Default: the Client's
+                                 `read_consistency_level`.
        
         Returns an Array of lists.Message instances.
         """
 
         lst = self.client.list(lst)
-        keys = get_unique_msg_keys(self.lst_msgs_fam, lst.key, uuidbytes)
-        return self.client.messages.multiget(keys)
+        level = read_level(self, read_consistency_level)
+        keys = get_unique_msg_keys(self.lst_msgs_fam, lst.key, uuidbytes,
+            read_consistency_level=level,
+            write_consistency_level=self.write_consistency_level)
+        return self.client.messages.multiget(keys, level)
 
-    def get(self, key):
+    def get(self, key, read_consistency_level=None):
         """Public: Get a List.
         
-        key - The String List key.
+        key                    - The String List key.
+        read_consistency_level - Optional ConsistencyLevel or FAST_READ for
+                                 this call.  Default: the Client's
+                                 `read_consistency_level`.
         
         Returns an entities.List.
         """
 
+        level = read_level(self, read_consistency_level)
         try:
-            return self.load(key, self.column_fam.get(key))
-        except pycassa.cassandra.c10.ttypes.NotFoundException:
+            return self.load(key,
+                self.column_fam.get(key, **read_options(level)))
+        except pycassa.NotFoundException:
             pass
 
     def save(self, lst):
@@ -81,7 +132,8 @@ class ListClient(object):
         """
 
         self.column_fam.insert(lst.key, {
-            'name': lst.name})
+            'name': lst.name},
+            **write_options(self.write_consistency_level))
 
     def load(self, key, values):
         """Builds a new List object from a Cassandra result.
@@ -106,53 +158,117 @@ class ListClient(object):
         Returns nothing.
         """
 
+        level = self.write_consistency_level
         update_timestamp_index(self.lst_msgs_fam,
-            msg.list.key, msg, old_updated)
+            msg.list.key, msg, old_updated, write_consistency_level=level)
         update_timestamp_index(self.lst_threads_fam,
-            msg.list.key, msg.thread, old_updated, 'message_updated_at')
+            msg.list.key, msg.thread, old_updated, 'message_updated_at',
+            write_consistency_level=level)
 
 class ThreadClient(object):
 
     def __init__(self, client, th_fam, lst_threads_fam, th_msgs_fam):
         self.client = client 
+        self.read_consistency_level = client.read_consistency_level
+        self.write_consistency_level = client.write_consistency_level
         self.column_fam = th_fam
         self.lst_threads_fam = lst_threads_fam
         self.th_msgs_fam = th_msgs_fam
 
-    def messages(self, thread):
+    def messages(self, thread, read_consistency_level=None):
         """Public: Gets a range of Messages in a Thread.
         
-        thread - a lists.Thread instance.
+        thread                 - a lists.Thread instance.
+        read_consistency_level - Optional ConsistencyLevel or FAST_READ for
+                                 this call.  Default: the Client's
+                                 `read_consistency_level`.
        
         Returns an Array of lists.Message instances.
         """
 
         thread = self.client.thread(thread)
-        keys = get_unique_msg_keys(self.th_msgs_fam, thread.key, uuidbytes)
-        return self.client.messages.multiget(keys)
+        level = read_level(self, read_consistency_level)
+        keys = get_unique_msg_keys(self.th_msgs_fam, thread.key, uuidbytes,
+            read_consistency_level=level,
+            write_consistency_level=self.write_consistency_level)
+        return self.client.messages.multiget(keys, level)
+
+    def previews(self, threads, count=2, read_consistency_level=None):
+        """Public: Gets the latest Messages for many Threads at once.  The
+        Thread indexes are read in one multiget, and every Message they
+        reference in another.  Threads whose latest index entries were
+        duplicates get their index read again after the cleanup.
+
+            for thread, msgs in c.threads.previews(c.lists.threads(lst)):
+                print thread, len(msgs)
+        
+        threads                - A List of lists.Thread instances or
+                                 "list/thread" Strings.
+        count                  - The Integer number of Messages for each
+                                 Thread.  Default: 2.
+        read_consistency_level - Optional ConsistencyLevel or FAST_READ for
+                                 this call.  Default: the Client's
+                                 `read_consistency_level`.
+       
+        Returns a List of Tuples of a lists.Thread and a List of its
+        lists.Message instances, newest first, with each Thread once.
+        """
 
-    def get(self, key):
+        unique = []
+        seen = set()
+        for thread in threads:
+            thread = self.client.thread(thread)
+            if thread.key not in seen:
+                seen.add(thread.key)
+                unique.append(thread)
+        threads = unique
+
+        level = read_level(self, read_consistency_level)
+        thread_keys = multiget_unique_msg_keys(self.th_msgs_fam,
+            [thread.key for thread in threads], count, uuidbytes,
+            read_consistency_level=level,
+            write_consistency_level=self.write_consistency_level)
+
+        keys = []
+        for thread in threads:
+            keys.extend(thread_keys.get(thread.key, []))
+
+        grouped = {}
+        for msg in self.client.messages.multiget(keys, level):
+            grouped.setdefault(msg.thread.key, []).append(msg)
+
+        return [(thread, grouped.get(thread.key, [])) for thread in threads]
+
+    def get(self, key, read_consistency_level=None):
         """Public: Get a Thread.
         
-        key - The String Thread key.
+        key                    - The String Thread key.
+        read_consistency_level - Optional ConsistencyLevel or FAST_READ for
+                                 this call.  Default: the Client's
+                                 `read_consistency_level`.
         
         Returns an entities.Thread.
         """
 
+        level = read_level(self, read_consistency_level)
         try:
-            return self.load(key, self.column_fam.get(key))
-        except pycassa.cassandra.c10.ttypes.NotFoundException:
+            return self.load(key,
+                self.column_fam.get(key, **read_options(level)))
+        except pycassa.NotFoundException:
             pass
 
-    def multiget(self, keys):
-        """Public: Gets a list of Messages.
+    def multiget(self, keys, read_consistency_level=None):
+        """Public: Gets a list of Threads.
 
-        keys - A List of String Message UUIDs.
+        keys                   - A List of String Thread keys.
+        read_consistency_level - Optional ConsistencyLevel or FAST_READ for
+                                 this call.  Default: the Client's
+                                 `read_consistency_level`.
 
-        Returns a List of entities.Message instances.
+        Returns a List of entities.Thread instances.
         """
 
-        return multiget(self, keys)
+        return multiget(self, keys, read_consistency_level)
 
     def save(self, thread):
         """Public: Stores the Thread in Cassandra.
@@ -166,7 +282,8 @@ class ThreadClient(object):
             'title': thread.title}
         if thread.message_updated_at:
             values['message_updated_at'] = thread.message_updated_at
-        self.column_fam.insert(thread.key, values)
+        self.column_fam.insert(thread.key, values,
+            **write_options(self.write_consistency_level))
 
     def load(self, key, values):
         """Builds a new Thread object from a Cassandra result.
@@ -193,10 +310,12 @@ class ThreadClient(object):
         """
 
         update_timestamp_index(self.th_msgs_fam,
-            msg.thread.key, msg, old_updated)
+            msg.thread.key, msg, old_updated,
+            write_consistency_level=self.write_consistency_level)
 
         now = msg.thread.message_updated_at = datetime.utcnow()
-        self.column_fam.insert(msg.thread.key, {"message_updated_at": now})
+        self.column_fam.insert(msg.thread.key, {"message_updated_at": now},
+            **write_options(self.write_consistency_level))
 
         self.client.lists.update_timestamp_index(msg, old_updated)
 
@@ -204,29 +323,38 @@ class MessageClient(object):
 
     def __init__(self, client, msgs_fam):
         self.client = client 
+        self.read_consistency_level = client.read_consistency_level
+        self.write_consistency_level = client.write_consistency_level
         self.column_fam = msgs_fam
 
-    def get(self, key):
+    def get(self, key, read_consistency_level=None):
         """Public: Gets a single Message.
         
-        key - String Message UUID.
+        key                    - String Message UUID.
+        read_consistency_level - Optional ConsistencyLevel or FAST_READ for
+                                 this call.  Default: the Client's
+                                 `read_consistency_level`.
         
         Returns an entities.Message.
         """
 
         id = self.client.uuid(key)
-        values = self.column_fam.get(id.bytes)
+        level = read_level(self, read_consistency_level)
+        values = self.column_fam.get(id.bytes, **read_options(level))
         return self.load(id, values)
 
-    def multiget(self, keys):
+    def multiget(self, keys, read_consistency_level=None):
         """Public: Gets a list of Messages.
 
-        keys - A List of String Message UUIDs.
+        keys                   - A List of String Message UUIDs.
+        read_consistency_level - Optional ConsistencyLevel or FAST_READ for
+                                 this call.  Default: the Client's
+                                 `read_consistency_level`.
 
         Returns a List of entities.Message instances.
         """
 
-        return multiget(self, keys)
+        return multiget(self, keys, read_consistency_level)
 
     def save(self, msg):
         """Public: Stores the Message in Cassandra and updates any indexes.
@@ -249,7 +377,8 @@ class MessageClient(object):
             "list_key": msg.list.key, "thread_key": msg.thread.key,
             "title": msg.title,
             "created_at": msg.created_at, "updated_at": msg.updated_at}
-        self.column_fam.insert(msg.key.bytes, columns)
+        self.column_fam.insert(msg.key.bytes, columns,
+            **write_options(self.write_consistency_level))
 
         self.client.threads.update_timestamp_index(msg, old_updated)
 
@@ -271,25 +400,63 @@ class MessageClient(object):
         thread = self.client.thread(values['list_key'], values['thread_key'])
         return self.client.msg(thread, key, **values)
 
-def multiget(client, keys):
-    """Handles a multiget against a column familiy.
+def multiget(client, keys, read_consistency_level=None):
+    """Handles a multiget against a column familiy.  FAST_READ multigets that
+    come back missing rows (index entries pointing at rows that haven't
+    reached the replica yet) retry the missing keys at the Client's
+    `fallback_consistency_level`.
 
-    client  - The *Client instance.
-    keys    - A List of String row keys.
+    client                 - The *Client instance.
+    keys                   - A List of String row keys.
+    read_consistency_level - Optional ConsistencyLevel or FAST_READ.  Default:
+                             the *Client's `read_consistency_level`.
 
     Returns a List of entities.
     """
 
+    level = read_level(client, read_consistency_level)
+    result = client.column_fam.multiget(keys, **read_options(level))
+    rows = result.items()
+
+    if level == FAST_READ:
+        found = set(uuidbytes(key) for key in result)
+        missing = [key for key in keys if uuidbytes(key) not in found]
+        if missing:
+            retried = client.column_fam.multiget(missing,
+                **read_options(client.client.fallback_consistency_level))
+            rows = merge_rows(keys, result, retried)
+
     msgs = []
-    rows = client.column_fam.multiget(keys)
-    for key in rows:
-        values = rows[key]
+    for key, values in rows:
         msgs.append(client.load(key, values))
 
     return msgs
 
+def merge_rows(keys, *results):
+    """Merges multiget results into a single List of rows, in the order of the
+    requested keys.  Repeated keys only get one row, like a single multiget.
+
+    keys    - A List of String row keys.
+    results - One or more multiget result Dicts.
+
+    Returns a List of (key, values) Tuples.
+    """
+
+    rows = {}
+    for result in results:
+        for key in result:
+            rows[uuidbytes(key)] = (key, result[key])
+
+    merged = []
+    for key in keys:
+        row = rows.pop(uuidbytes(key), None)
+        if row:
+            merged.append(row)
+
+    return merged
+
 def update_timestamp_index(column_fam, key, entity, old_updated=None,
-        updated_attr='updated_at'):
+        updated_attr='updated_at', write_consistency_level=None):
     """Updates the a column family used strictly for indexing by timestamp.
     If the Message is being updated, pass the old `updated_at` value for 
     `old_updated` so it can be cleaned up.
@@ -300,35 +467,92 @@ def update_timestamp_index(column_fam, key, entity, old_updated=None,
     old_updated  - Optional DateTime of the entity's `updated_at` before the
                    update.
     updated_attr - The String timestamp column name.  Default: "updated_at".
+    write_consistency_level - Optional ConsistencyLevel for the writes.
     
     Returns nothing.
     """
 
+    options = write_options(write_consistency_level)
     updated = getattr(entity, updated_attr)
-    column_fam.insert(key, {(updated, entity.key): ''})
+    column_fam.insert(key, {(updated, entity.key): ''}, **options)
     if old_updated:
-        column_fam.remove(key, [(old_updated, entity.key)])
+        column_fam.remove(key, [(old_updated, entity.key)], **options)
 
-def get_unique_msg_keys(column_fam, key, filter_comparator=None):
+def get_unique_msg_keys(column_fam, key, filter_comparator=None,
+        read_consistency_level=None, write_consistency_level=None):
     """Gets the range of Message keys for the given Thread.  Cleanup any multiple
     Message IDs with old timestamps.
     
-    column_fam        - The ColumnFamily that is being queried.
-    key               - The String row key.
-    filter_comparator - Function applied to IDs before being returned in the
-                        unique List of keys.  Default: str().
+    column_fam              - The ColumnFamily that is being queried.
+    key                     - The String row key.
+    filter_comparator       - Function applied to IDs before being returned in
+                              the unique List of keys.  Default: str().
+    read_consistency_level  - Optional ConsistencyLevel or FAST_READ for the
+                              index read.
+    write_consistency_level - Optional ConsistencyLevel for the dupe cleanup.
     
     Returns a List of String Message keys.
     """
 
-    entries = column_fam.get(key, column_count=50)
+    try:
+        entries = column_fam.get(key, column_count=50,
+            **read_options(read_consistency_level))
+    except pycassa.NotFoundException:
+        return []
+
     keys, dupes = filter_dupes(entries, filter_comparator)
 
     if len(dupes) > 0:
-        column_fam.remove(key, dupes)
+        column_fam.remove(key, dupes,
+            **write_options(write_consistency_level))
 
     return keys
 
+def multiget_unique_msg_keys(column_fam, keys, column_count,
+        filter_comparator=None, read_consistency_level=None,
+        write_consistency_level=None):
+    """Gets the latest Message keys for many rows in one multiget.  Cleanup
+    any multiple Message IDs with old timestamps.  Rows that come back with
+    fewer than `column_count` unique keys after the cleanup are read once
+    more in a second multiget, so they can still come back short if that
+    read finds more dupes.
+    
+    column_fam              - The ColumnFamily that is being queried.
+    keys                    - A List of String row keys.
+    column_count            - The maximum Integer number of index entries
+                              read from each row.
+    filter_comparator       - Function applied to IDs before being returned in
+                              the unique List of keys.  Default: str().
+    read_consistency_level  - Optional ConsistencyLevel or FAST_READ for the
+                              index read.
+    write_consistency_level - Optional ConsistencyLevel for the dupe cleanup.
+    
+    Returns a Dict of String row keys to Lists of String Message keys.
+    """
+
+    if not keys:
+        return {}
+
+    unique = {}
+    for attempt in xrange(2):
+        rows = column_fam.multiget(keys, column_count=column_count,
+            **read_options(read_consistency_level))
+
+        short = []
+        for key in rows:
+            unique[key], dupes = filter_dupes(rows[key], filter_comparator)
+            if len(dupes) > 0:
+                column_fam.remove(key, dupes,
+                    **write_options(write_consistency_level))
+                if len(rows[key]) == column_count:
+                    short.append(key)
+
+        if not short:
+            break
+        keys = short
+
+    return unique
+
 def filter_dupes(entries, id_comparator=None):
     """Partitions the list of entries into two lists: one containing uniques, and
     one containing the duplicates.
@@ -362,6 +586,50 @@ def filter_dupes(entries, id_comparator=None):
 
     return (keys, dupes)
 
+def read_level(client, level=None):
+    """Picks the read consistency level for a single call.
+
+    client - The *Client instance.
+    level  - Optional ConsistencyLevel or FAST_READ passed to the call.
+
+    Returns a ConsistencyLevel, FAST_READ, or None for the pool's default.
+    """
+
+    if level is None:
+        return client.read_consistency_level
+    else:
+        return level
+
+def read_options(level):
+    """Builds the pycassa keyword arguments for a read.  FAST_READ reads at
+    ONE.
+
+    level - A ConsistencyLevel, FAST_READ, or None for the pool's default.
+
+    Returns a Dict.
+    """
+
+    if level == FAST_READ:
+        level = ConsistencyLevel.ONE
+
+    if level is None:
+        return {}
+    else:
+        return {'read_consistency_level': level}
+
+def write_options(level):
+    """Builds the pycassa keyword arguments for a write.
+
+    level - A ConsistencyLevel, or None for the pool's default.
+
+    Returns a Dict.
+    """
+
+    if level is None:
+        return {}
+    else:
+        return {'write_consistency_level': level}
+
 def uuidbytes(uuid):
     if hasattr(uuid, 'bytes'):
         return uuid.bytes
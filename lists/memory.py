@@ -0,0 +1,260 @@
+import threading
+import time
+from collections import OrderedDict
+from hashlib import md5
+
+import pycassa
+
+# A local stand-in for Cassandra that lets the Client run without a cluster.
+#
+#   pool = MemoryPool()
+#   c = Client("liststest", pool=pool, column_family=MemoryColumnFamily)
+
+class MemoryPool(object):
+
+    def __init__(self, latency=0):
+        """Holds the rows for every MemoryColumnFamily built from it.
+
+        latency - Optional Float seconds to sleep on every round trip.
+        """
+
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.column_families = {}
+
+    def rows(self, name):
+        """Gets the rows of a column family, creating it if needed.
+
+        name - The String column family name.
+
+        Returns a Dict of row keys to Dicts of columns.
+        """
+
+        with self.lock:
+            return self.column_families.setdefault(name, {})
+
+    def column_family(self, name):
+        """Builds a MemoryColumnFamily on this pool.
+
+        name - The String column family name.
+
+        Returns a MemoryColumnFamily.
+        """
+
+        return MemoryColumnFamily(self, name)
+
+    def dispose(self):
+        """Does nothing, like disposing a ConnectionPool with no
+        connections."""
+
+class MemoryColumnFamily(object):
+
+    def __init__(self, pool, name):
+        self.pool = pool
+        self.name = name
+        self.rows = pool.rows(name)
+
+    def get(self, key, columns=None, column_count=100, **kwargs):
+        """Gets a single row.  Raises NotFoundException if it is empty.
+
+        key          - The row key.
+        columns      - Optional List of column names.
+        column_count - The maximum Integer number of columns.  Default: 100.
+
+        Returns a Dict of column names to values, in comparator order.
+        """
+
+        self.round_trip()
+        with self.pool.lock:
+            row = self.slice(key, columns, column_count)
+        if not row:
+            raise pycassa.NotFoundException()
+        return row
+
+    def multiget(self, keys, columns=None, column_count=100, **kwargs):
+        """Gets many rows at once.  Empty rows are left out.
+
+        keys         - A List of row keys.
+        columns      - Optional List of column names.
+        column_count - The maximum Integer number of columns in each row.
+                       Default: 100.
+
+        Returns a Dict of row keys to Dicts of columns, in the order of keys.
+        """
+
+        self.round_trip()
+        rows = OrderedDict()
+        with self.pool.lock:
+            for key in keys:
+                row = self.slice(key, columns, column_count)
+                if row:
+                    rows[key] = row
+        return rows
+
+    def get_range(self, start_token=None, finish_token=None, columns=None,
+            column_count=100, **kwargs):
+        """Iterates over every row, or the rows in a token range.
+
+        start_token  - Optional String token the range starts after.
+        finish_token - Optional String token the range ends on.
+        columns      - Optional List of column names.
+        column_count - The maximum Integer number of columns in each row.
+                       Default: 100.
+
+        Returns an iterator of (key, columns) Tuples.
+        """
+
+        self.round_trip()
+        with self.pool.lock:
+            keys = list(self.rows)
+        if start_token is not None:
+            keys = [key for key in keys
+                if int(start_token) < token(key) <= int(finish_token)]
+        for key in keys:
+            with self.pool.lock:
+                row = self.slice(key, columns, column_count)
+            if row:
+                yield key, row
+
+    def xget(self, key, **kwargs):
+        """Iterates over every column in a row.
+
+        key - The row key.
+
+        Returns an iterator of (column name, value) Tuples.
+        """
+
+        self.round_trip()
+        with self.pool.lock:
+            row = self.slice(key, None, None)
+        return row.iteritems()
+
+    def batch(self, queue_size=100, **kwargs):
+        """Builds a MemoryBatch that queues up mutations.
+
+        queue_size - The Integer number of mutations sent at once.
+                     Default: 100.
+
+        Returns a MemoryBatch.
+        """
+
+        return MemoryBatch(self, queue_size)
+
+    def insert(self, key, columns, **kwargs):
+        """Inserts or updates columns in a row.
+
+        key     - The row key.
+        columns - A Dict of column names to values.
+
+        Returns nothing.
+        """
+
+        self.round_trip()
+        with self.pool.lock:
+            self.rows.setdefault(key, {}).update(columns)
+
+    def remove(self, key, columns=None, **kwargs):
+        """Removes columns from a row, or the whole row.
+
+        key     - The row key.
+        columns - Optional List of column names.  Default: every column.
+
+        Returns nothing.
+        """
+
+        self.round_trip()
+        with self.pool.lock:
+            if columns is None:
+                self.rows.pop(key, None)
+                return
+            row = self.rows.get(key, {})
+            for name in columns:
+                row.pop(name, None)
+
+    def slice(self, key, columns, column_count):
+        row = self.rows.get(key, {})
+        if columns is None:
+            names = sort_columns(row.keys())[:column_count]
+        else:
+            names = [name for name in columns if name in row]
+
+        sliced = OrderedDict()
+        for name in names:
+            sliced[name] = row[name]
+        return sliced
+
+    def round_trip(self):
+        if self.pool.latency:
+            time.sleep(self.pool.latency)
+
+class MemoryBatch(object):
+
+    def __init__(self, column_fam, queue_size):
+        self.column_fam = column_fam
+        self.queue_size = queue_size
+        self.mutations = []
+
+    def insert(self, key, columns):
+        self.queue(('insert', key, columns))
+
+    def remove(self, key, columns=None):
+        self.queue(('remove', key, columns))
+
+    def queue(self, mutation):
+        self.mutations.append(mutation)
+        if len(self.mutations) >= self.queue_size:
+            self.send()
+
+    def send(self):
+        """Applies every queued mutation in one round trip.
+
+        Returns nothing.
+        """
+
+        if not self.mutations:
+            return
+
+        self.column_fam.round_trip()
+        with self.column_fam.pool.lock:
+            for name, key, columns in self.mutations:
+                row = self.column_fam.rows.setdefault(key, {})
+                if name == 'insert':
+                    row.update(columns)
+                elif columns is None:
+                    row.clear()
+                else:
+                    for column in columns:
+                        row.pop(column, None)
+        self.mutations = []
+
+def token(key):
+    """Computes the RandomPartitioner token of a row key.
+
+    key - The String row key, or a UUID.
+
+    Returns a Long token between 0 and 2**127.
+    """
+
+    if hasattr(key, 'bytes'):
+        key = key.bytes
+    elif isinstance(key, unicode):
+        key = key.encode('utf-8')
+
+    value = int(md5(key).hexdigest(), 16)
+    if value >= 2 ** 127:
+        value = 2 ** 128 - value
+    return value
+
+def sort_columns(names):
+    """Sorts column names the way the schema's comparators do.  Composite
+    (timestamp, key) index columns put the newest timestamps first.
+
+    names - A List of column names.
+
+    Returns a sorted List of column names.
+    """
+
+    names = sorted(names)
+    if names and isinstance(names[0], tuple):
+        names.sort(key=lambda name: name[0], reverse=True)
+    return names
@@ -0,0 +1,427 @@
+import cPickle
+import os
+import shutil
+import tempfile
+from multiprocessing import Pool
+from multiprocessing.util import Finalize
+
+from pycassa.pool import ConnectionPool
+from pycassa.columnfamily import ColumnFamily
+
+import entities
+from memory import token
+
+# Recomputes the timestamp index column families from the `messages` and
+# `threads` rows, and fixes any drift from failed partial saves or leftover
+# duplicate entries.  Run it while writes are stopped.
+#
+#   drift = rebuild(Keyspace("liststest"), dry_run=True, processes=4)
+#   print report(drift)
+#
+# The rebuild runs in two passes over `splits` token ranges:
+#
+#   1. Workers scan `messages` and `threads`, and write the index entries
+#      they imply to spill files in a local temporary directory, grouped by
+#      the token range of each index row key.
+#   2. One worker per token range loads that range's spill files, reads the
+#      live index rows in the same range, and diffs and corrects them.  It
+#      also repairs `message_updated_at` on Threads whose newest Message
+#      is newer.
+#
+# The parent only sums up the drift counts.  Each worker holds one token
+# range of index rows in memory at a time, so raise `splits` until that
+# fits, and leave room in the temporary directory for a copy of the index
+# entries.  Token ranges assume the RandomPartitioner.
+
+INDEXES = ('list_messages', 'thread_messages', 'list_threads')
+
+# The columns a `messages` or `threads` row needs to be indexed.  Rows
+# without them are skipped and counted, like a `threads` row that only got
+# the `message_updated_at` from a Message saved to an unsaved Thread.
+REQUIRED = {'messages': ('list_key', 'thread_key', 'updated_at'),
+    'threads': ('list_key',)}
+
+# The Keyspace a worker process connected to in connect().
+keyspace = None
+
+class Keyspace(object):
+
+    def __init__(self, keyspace, **kwargs):
+        """Connects to a keyspace lazily, so it can be sent to worker
+        processes.
+
+        keyspace - The String keyspace name.
+        kwargs   - Options passed to the ConnectionPool.
+        """
+
+        self.keyspace = keyspace
+        self.kwargs = kwargs
+        self.pool = None
+
+    def column_family(self, name):
+        """Builds a ColumnFamily, connecting the pool if needed.
+
+        name - The String column family name.
+
+        Returns a ColumnFamily.
+        """
+
+        if self.pool is None:
+            self.pool = ConnectionPool(self.keyspace, **self.kwargs)
+        return ColumnFamily(self.pool, name)
+
+    def dispose(self):
+        """Closes the pool's connections, if it connected.
+
+        Returns nothing.
+        """
+
+        if self.pool is not None:
+            self.pool.dispose()
+            self.pool = None
+
+    def __getstate__(self):
+        return {'keyspace': self.keyspace, 'kwargs': self.kwargs,
+            'pool': None}
+
+def rebuild(keyspace, dry_run=False, splits=16, processes=4,
+        batch_size=1000, column_count=1000):
+    """Public: Rebuilds and verifies the timestamp index column families.
+
+    keyspace     - A Keyspace, or anything with `column_family(name)` and
+                   `dispose()` methods like lists.memory.MemoryPool.
+    dry_run      - Boolean that only reports the drift.  Default: False.
+    splits       - The Integer number of token ranges.  Default: 16.
+    processes    - The Integer number of worker processes.  Use 0 to work in
+                   this process, which the MemoryPool needs.  Default: 4.
+    batch_size   - The Integer number of mutations sent at once.
+                   Default: 1000.
+    column_count - The Integer number of index columns read with each row
+                   before paging through the rest.  Default: 1000.
+
+    Returns a Dict of column family names to drift Dicts:
+      rows    - The Integer number of rows checked.
+      drifted - The Integer number of rows that had drifted.
+      missing - The Integer number of entries that were missing, or stale
+                `message_updated_at` columns for "threads".
+      extra   - The Integer number of stale or duplicate entries.
+      skipped - The Integer number of "messages" and "threads" rows that
+                were missing REQUIRED columns.
+    """
+
+    ranges = token_ranges(splits)
+    spill = tempfile.mkdtemp(prefix='lists-rebuild-')
+    try:
+        for i in xrange(splits):
+            os.mkdir(os.path.join(spill, str(i)))
+
+        scans = []
+        for name in ('messages', 'threads'):
+            for i, (start, finish) in enumerate(ranges):
+                scans.append((spill, ranges, name, i, start, finish))
+        partitions = [(spill, i, start, finish, dry_run, batch_size,
+            column_count) for i, (start, finish) in enumerate(ranges)]
+
+        if processes:
+            workers = Pool(processes, connect, (keyspace,))
+            try:
+                results = workers.map(scan, scans)
+                results += workers.map(rebuild_partition, partitions)
+            finally:
+                workers.close()
+                workers.join()
+        else:
+            connect(keyspace, False)
+            try:
+                results = map(scan, scans)
+                results += map(rebuild_partition, partitions)
+            finally:
+                disconnect()
+    finally:
+        shutil.rmtree(spill)
+
+    drift = {}
+    for name in ('messages', 'threads') + INDEXES:
+        drift[name] = dict.fromkeys(('rows', 'drifted', 'missing', 'extra',
+            'skipped'), 0)
+    for result in results:
+        for name, counts in result.iteritems():
+            totals = drift[name]
+            for count in counts:
+                totals[count] += counts[count]
+
+    return drift
+
+def connect(worker_keyspace, finalize=True):
+    """Sets the Keyspace a worker process uses for every task.  Pool calls
+    it once as each worker starts, and the worker disposes the Keyspace's
+    pool as it exits.
+
+    worker_keyspace - The Keyspace.
+    finalize        - Boolean that registers the dispose for when the
+                      process exits.  Default: True.
+
+    Returns nothing.
+    """
+
+    global keyspace
+    keyspace = worker_keyspace
+    if finalize:
+        Finalize(keyspace, disconnect, exitpriority=10)
+
+def disconnect():
+    global keyspace
+    if keyspace is not None:
+        keyspace.dispose()
+        keyspace = None
+
+def scan(task):
+    """Reads `messages` or `threads` rows in one token range, and spills the
+    index entries they imply by the token range of each index row key.
+
+    task - A Tuple of the String spill directory, the List of token ranges,
+           the String column family name, the Integer task number, and the
+           String start and finish tokens.
+
+    Returns a Dict of the column family name to a drift Dict with the rows
+    scanned for "messages", and the rows skipped.
+    """
+
+    spill, ranges, name, number, start, finish = task
+    column_fam = keyspace.column_family(name)
+    buckets = {}
+    counts = {'skipped': 0}
+    if name == 'messages':
+        counts['rows'] = 0
+
+    def bucket(row_key):
+        return buckets.setdefault(partition(ranges, row_key), {
+            'list_messages': {}, 'thread_messages': {}, 'newest': {},
+            'threads': {}})
+
+    for key, values in column_fam.get_range(start_token=start,
+            finish_token=finish):
+        if name == 'messages':
+            counts['rows'] += 1
+        if [column for column in REQUIRED[name] if column not in values]:
+            counts['skipped'] += 1
+            continue
+
+        if name == 'threads':
+            bucket(values['list_key'])['threads'][key] = (
+                values['list_key'], values.get('message_updated_at'))
+            continue
+
+        lst, thread = values['list_key'], values['thread_key']
+        column = (values['updated_at'], entities._uuid(key))
+        bucket(lst)['list_messages'].setdefault(lst, set()).add(column)
+        bucket(thread)['thread_messages'].setdefault(thread, set()).add(
+            column)
+
+        newest = bucket(lst)['newest']
+        if newest.get((lst, thread), column[0]) <= column[0]:
+            newest[(lst, thread)] = column[0]
+
+    for i, entries in buckets.iteritems():
+        with open(os.path.join(spill, str(i), '%s-%d' % (name, number)),
+                'wb') as file:
+            cPickle.dump(entries, file, cPickle.HIGHEST_PROTOCOL)
+
+    return {name: counts}
+
+def rebuild_partition(task):
+    """Recomputes, diffs and corrects the index rows in one token range.
+
+    task - A Tuple of the String spill directory, the Integer partition
+           number, the String start and finish tokens, the dry_run Boolean,
+           the Integer batch size, and the Integer index column count.
+
+    Returns a Dict of column family names to drift Dicts.
+    """
+
+    spill, number, start, finish, dry_run, batch_size, column_count = task
+    expected, stale = expected_indexes(load_spills(spill, number))
+
+    drift = {}
+    for name in INDEXES:
+        column_fam = keyspace.column_family(name)
+        live = scan_index(column_fam, start, finish, column_count)
+        changes = diff(expected[name], live)
+        drift[name] = summarize(changes, expected[name], live)
+        if not dry_run:
+            correct(column_fam, changes, batch_size)
+
+    drift['threads'] = {'rows': expected['threads'], 'drifted': len(stale),
+        'missing': len(stale), 'extra': 0}
+    if not dry_run and stale:
+        batch = keyspace.column_family('threads').batch(queue_size=batch_size)
+        for key, updated in stale.iteritems():
+            batch.insert(key, {'message_updated_at': updated})
+        batch.send()
+
+    return drift
+
+def load_spills(spill, number):
+    """Merges the spill files that scan() wrote for one token range.
+
+    spill  - The String spill directory.
+    number - The Integer partition number.
+
+    Returns a Dict like the buckets scan() spills.
+    """
+
+    merged = {'list_messages': {}, 'thread_messages': {}, 'newest': {},
+        'threads': {}}
+    directory = os.path.join(spill, str(number))
+    for filename in os.listdir(directory):
+        with open(os.path.join(directory, filename), 'rb') as file:
+            entries = cPickle.load(file)
+        for name in ('list_messages', 'thread_messages'):
+            for key, columns in entries[name].iteritems():
+                merged[name].setdefault(key, set()).update(columns)
+        for key, updated in entries['newest'].iteritems():
+            if merged['newest'].get(key, updated) <= updated:
+                merged['newest'][key] = updated
+        merged['threads'].update(entries['threads'])
+
+    return merged
+
+def expected_indexes(entries):
+    """Recomputes what the index rows of one token range should contain.  A
+    Thread is indexed at its `message_updated_at`, or at its newest Message
+    when a partial save left `message_updated_at` behind.
+
+    entries - The Dict returned by load_spills().
+
+    Returns a Tuple of a Dict and a Dict of Thread keys to the DateTime
+    their stale `message_updated_at` should be.  The first Dict has index
+    column family names to Dicts of row keys to Sets of (timestamp, key)
+    index columns, and "threads" to the Integer number of Threads checked.
+    """
+
+    expected = {'list_messages': entries['list_messages'],
+        'thread_messages': entries['thread_messages'], 'list_threads': {}}
+    stale = {}
+
+    threads = entries['threads']
+    expected['threads'] = 0
+    for (lst, key), newest in entries['newest'].iteritems():
+        if key not in threads:
+            continue
+        expected['threads'] += 1
+        updated = threads[key][1]
+        if updated is None or updated < newest:
+            stale[key] = updated = newest
+        expected['list_threads'].setdefault(lst, set()).add((updated, key))
+
+    return (expected, stale)
+
+def scan_index(column_fam, start, finish, column_count):
+    """Reads the live index rows in one token range.
+
+    column_fam   - The index ColumnFamily.
+    start        - The String token the range starts after.
+    finish       - The String token the range ends on.
+    column_count - The Integer number of columns read with each row before
+                   paging through the rest.
+
+    Returns a Dict of row keys to Dicts of index columns.
+    """
+
+    rows = {}
+    for key, columns in column_fam.get_range(start_token=start,
+            finish_token=finish, column_count=column_count):
+        if len(columns) >= column_count:
+            columns = column_fam.xget(key)
+        rows[key] = dict(columns)
+    return rows
+
+def diff(expected, live):
+    """Compares the expected rows of an index with the live rows.
+
+    expected - A Dict of row keys to Sets of index columns.
+    live     - A Dict of row keys to Dicts of index columns.
+
+    Returns a Dict of row keys to Tuples of a List of missing columns and a
+    List of extra columns.
+    """
+
+    changes = {}
+    for key in set(expected) | set(live):
+        wanted = expected.get(key, set())
+        existing = set(live.get(key, {}))
+        missing, extra = wanted - existing, existing - wanted
+        if missing or extra:
+            changes[key] = (sorted(missing), sorted(extra))
+
+    return changes
+
+def summarize(changes, expected, live):
+    return {
+        'rows': len(set(expected) | set(live)),
+        'drifted': len(changes),
+        'missing': sum(len(missing) for missing, extra in changes.values()),
+        'extra': sum(len(extra) for missing, extra in changes.values())}
+
+def correct(column_fam, changes, batch_size):
+    """Writes the index corrections in batches.
+
+    column_fam - The index ColumnFamily.
+    changes    - The Dict returned by diff().
+    batch_size - The Integer number of mutations sent at once.
+
+    Returns nothing.
+    """
+
+    batch = column_fam.batch(queue_size=batch_size)
+    for key, (missing, extra) in changes.iteritems():
+        if missing:
+            batch.insert(key, dict((column, '') for column in missing))
+        if extra:
+            batch.remove(key, extra)
+    batch.send()
+
+def token_ranges(splits):
+    """Splits the RandomPartitioner token ring into ranges.  Each range
+    starts after its start token and ends on its finish token.
+
+    splits - The Integer number of ranges.
+
+    Returns a List of Tuples of String start and finish tokens.
+    """
+
+    ring = 2 ** 127
+    bounds = [ring * i // splits for i in xrange(splits + 1)]
+    bounds[0] = -1
+    return [(str(bounds[i]), str(bounds[i + 1])) for i in xrange(splits)]
+
+def partition(ranges, key):
+    """Finds the token range a row key belongs to.
+
+    ranges - The List returned by token_ranges().
+    key    - The row key.
+
+    Returns the Integer index of the range.
+    """
+
+    value = token(key)
+    for i, (start, finish) in enumerate(ranges):
+        if int(start) < value <= int(finish):
+            return i
+
+def report(drift):
+    """Formats the drift returned by rebuild().
+
+    drift - The Dict returned by rebuild().
+
+    Returns a String.
+    """
+
+    lines = ["%-16s %8s %8s %8s %8s %8s" % (
+        "index", "rows", "drifted", "missing", "extra", "skipped")]
+    for name in INDEXES + ('threads', 'messages'):
+        counts = drift[name]
+        lines.append("%-16s %8d %8d %8d %8d %8d" % (name, counts['rows'],
+            counts['drifted'], counts['missing'], counts['extra'],
+            counts['skipped']))
+    return "\n".join(lines)
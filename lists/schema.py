@@ -18,7 +18,7 @@ class Schema(object):
     def create_keyspace(self):
         try:
             self.sys.drop_keyspace(self.keyspace)
-        except pycassa.cassandra.c10.ttypes.InvalidRequestException:
+        except pycassa.InvalidRequestException:
             pass
 
         self.sys.create_keyspace(self.keyspace,
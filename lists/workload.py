@@ -0,0 +1,371 @@
+import bisect
+import json
+import random
+import threading
+import time
+from Queue import Queue
+
+from client import Client
+from memory import MemoryPool, MemoryColumnFamily
+
+from pycassa.columnfamily import ColumnFamily
+
+# Generates and replays realistic forum load against a Client.
+#
+#   workload = Workload(lists=20, threads=50, skew=1.2)
+#   ops = list(workload.operations(10000))
+#
+#   c, counter = client(memory=True)
+#   prepare(c, ops)
+#   print report(run(c, ops, counter, concurrency=8))
+
+class Workload(object):
+
+    def __init__(self, lists=10, threads=100, reads=0.8, writes=0.15,
+            edits=0.05, list_views=0.5, skew=1.1, seed=None):
+        """Describes the mix of operations to generate.
+
+        lists      - The Integer number of Lists.  Default: 10.
+        threads    - The Integer number of Threads in each List.  Default: 100.
+        reads      - The Float weight of page views.  Default: 0.8.
+        writes     - The Float weight of new Messages.  Default: 0.15.
+        edits      - The Float weight of edited Messages.  Default: 0.05.
+        list_views - The Float share of page views that are List pages instead
+                     of Thread pages.  Default: 0.5.
+        skew       - The Float Zipf exponent used to pick Lists and Threads.
+                     Default: 1.1.
+        seed       - Optional seed for the random generator.
+        """
+
+        self.lists = lists
+        self.threads = threads
+        self.list_views = list_views
+        self.random = random.Random(seed)
+        self.list_cdf = zipf_cdf(lists, skew)
+        self.thread_cdf = zipf_cdf(threads, skew)
+
+        total = float(reads + writes + edits)
+        self.op_cdf = [reads / total, (reads + writes) / total, 1.0]
+
+    def list_key(self, rank):
+        return "list-%d@example.com" % rank
+
+    def thread_key(self, list_rank, rank):
+        """Builds a Thread key.  `threads` rows are keyed by the Thread key
+        alone, so it includes the List rank to keep each List's Threads
+        apart."""
+
+        return "list-%d-thread-%d" % (list_rank, rank)
+
+    def operations(self, count):
+        """Generates operations.  Edits only target Threads that were posted
+        to earlier in the sequence, and become posts otherwise.
+
+        count - The Integer number of operations.
+
+        Returns an iterator of operation Tuples:
+          ("list", list_key)
+          ("thread", list_key, thread_key)
+          ("post", list_key, thread_key)
+          ("edit", list_key, thread_key)
+        """
+
+        posted = set()
+        for i in xrange(count):
+            list_rank = pick(self.random, self.list_cdf) + 1
+            lst = self.list_key(list_rank)
+            thread = self.thread_key(list_rank,
+                pick(self.random, self.thread_cdf) + 1)
+            op = ("read", "post", "edit")[pick(self.random, self.op_cdf)]
+
+            if op == "read":
+                if self.random.random() < self.list_views:
+                    yield ("list", lst)
+                else:
+                    yield ("thread", lst, thread)
+            elif op == "edit" and (lst, thread) in posted:
+                yield ("edit", lst, thread)
+            else:
+                posted.add((lst, thread))
+                yield ("post", lst, thread)
+
+class RoundTripCounter(object):
+
+    def __init__(self):
+        """Counts round trips made by the current thread."""
+
+        self.local = threading.local()
+
+    def count(self):
+        return getattr(self.local, 'count', 0)
+
+    def increment(self):
+        self.local.count = self.count() + 1
+
+    def column_family(self, factory=ColumnFamily):
+        """Builds a column family factory for Client that counts every
+        round trip.
+
+        factory - Function that builds a column family from a pool and a
+                  String name.  Default: pycassa's ColumnFamily.
+
+        Returns a Function.
+        """
+
+        def build(pool, name):
+            return CountedColumnFamily(factory(pool, name), self)
+        return build
+
+class CountedColumnFamily(object):
+    methods = ('get', 'multiget', 'get_range', 'insert', 'remove')
+
+    def __init__(self, column_fam, counter):
+        self.column_fam = column_fam
+        self.counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self.column_fam, name)
+        if name not in self.__class__.methods:
+            return attr
+
+        def counted(*args, **kwargs):
+            self.counter.increment()
+            return attr(*args, **kwargs)
+        return counted
+
+def client(keyspace="liststest", memory=False, latency=0, **kwargs):
+    """Builds a Client that counts its round trips.
+
+    keyspace - The String keyspace name.  Default: "liststest".
+    memory   - Boolean that uses the local MemoryPool stand-in instead of
+               Cassandra.  Default: False.
+    latency  - Float seconds the stand-in sleeps on every round trip.
+    kwargs   - Options passed to the Client.
+
+    Returns a Tuple of a Client and a RoundTripCounter.
+    """
+
+    counter = RoundTripCounter()
+    if memory:
+        kwargs['pool'] = MemoryPool(latency)
+        kwargs['column_family'] = counter.column_family(MemoryColumnFamily)
+    else:
+        kwargs['column_family'] = counter.column_family()
+    return (Client(keyspace, **kwargs), counter)
+
+def prepare(client, ops):
+    """Stores every List and Thread the operations use, so generated and
+    replayed operations both run against saved rows.
+
+    client - The lists.client.Client.
+    ops    - A List of operation Tuples.
+
+    Returns nothing.
+    """
+
+    lists = set()
+    threads = set()
+    for op in ops:
+        lists.add(op[1])
+        if len(op) > 2:
+            threads.add((op[1], op[2]))
+
+    for key in sorted(lists):
+        client.lists.save(client.list(key, name=key))
+    for lst, key in sorted(threads):
+        client.threads.save(client.thread(lst, key, title=key))
+
+def run(client, ops, counter, concurrency=1):
+    """Runs operations against the Client from a pool of worker threads.
+
+    client      - The lists.client.Client.
+    ops         - An iterable of operation Tuples.
+    counter     - The RoundTripCounter the Client was built with.
+    concurrency - The Integer number of worker threads.  Default: 1.
+
+    Returns a Dict of results:
+      elapsed - The Float seconds taken by every operation.
+      ops     - A Dict of the names of the operations that ran to Lists of
+                (seconds, round trips) Tuples.  Edits of Threads that have no
+                Message yet run as posts.
+      errors  - A Dict of operation names to Dicts of "Class: message"
+                Strings to Integer counts of failures.
+    """
+
+    queue = Queue()
+    for op in ops:
+        queue.put(op)
+
+    results = {}
+    errors = {}
+    lock = threading.Lock()
+    state = {}
+
+    def work():
+        while True:
+            op = queue.get()
+            if op is None:
+                return
+            before = counter.count()
+            start = time.time()
+            try:
+                name = perform(client, op, state, lock)
+            except Exception, e:
+                error = "%s: %s" % (e.__class__.__name__, e)
+                with lock:
+                    failures = errors.setdefault(op[0], {})
+                    failures[error] = failures.get(error, 0) + 1
+                continue
+            elapsed = time.time() - start
+            with lock:
+                results.setdefault(name, []).append(
+                    (elapsed, counter.count() - before))
+
+    workers = [threading.Thread(target=work) for i in xrange(concurrency)]
+    for worker in workers:
+        queue.put(None)
+
+    start = time.time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    return {'elapsed': time.time() - start, 'ops': results, 'errors': errors}
+
+def perform(client, op, state, lock):
+    """Runs a single operation.  Posts and edits remember their Message so
+    later edits of the Thread can save it again.  Concurrent edits of the
+    same Thread save stale copies, which leaves the duplicate index entries
+    that reads clean up.
+
+    client - The lists.client.Client.
+    op     - An operation Tuple.
+    state  - A Dict of (list key, thread key) Tuples to the last posted
+             entities.Message.
+    lock   - The Lock guarding state.
+
+    Returns the String name of the operation that ran.
+    """
+
+    name = op[0]
+    if name == "list":
+        client.lists.threads(op[1])
+    elif name == "thread":
+        client.threads.messages(client.thread(op[1], op[2]))
+    else:
+        key = (op[1], op[2])
+        with lock:
+            msg = state.get(key)
+
+        if name == "edit" and msg:
+            msg = client.msg(msg.thread, msg.key, title=msg.title,
+                created_at=msg.created_at, updated_at=msg.updated_at)
+            msg.title = "%s (edited)" % msg.title
+        else:
+            name = "post"
+            msg = client.msg(client.thread(op[1], op[2]), title="Message")
+
+        client.messages.save(msg)
+        with lock:
+            state[key] = msg
+
+    return name
+
+def record(ops, file):
+    """Writes operations to a trace file, one JSON Array per line.
+
+    ops  - An iterable of operation Tuples.
+    file - A writable File.
+
+    Returns nothing.
+    """
+
+    for op in ops:
+        file.write(json.dumps(op))
+        file.write("\n")
+
+def replay(file):
+    """Reads operations from a trace file written by record().
+
+    file - A readable File.
+
+    Returns an iterator of operation Tuples.
+    """
+
+    for line in file:
+        line = line.strip()
+        if line:
+            yield tuple(str(part) for part in json.loads(line))
+
+def report(results):
+    """Summarizes the results of run().
+
+    results - The Dict returned by run().
+
+    Returns a String report with throughput, latency percentiles in
+    milliseconds and round trips for every operation.
+    """
+
+    total = sum(len(timings) for timings in results['ops'].values())
+    lines = ["%d ops in %.2fs (%.1f ops/s)" % (total, results['elapsed'],
+        total / max(results['elapsed'], 1e-9))]
+    lines.append("%-8s %7s %8s %8s %8s %8s %8s" % (
+        "op", "count", "p50", "p95", "p99", "max", "trips/op"))
+
+    for name in sorted(results['ops']):
+        timings = results['ops'][name]
+        latencies = sorted(elapsed * 1000 for elapsed, trips in timings)
+        trips = sum(trips for elapsed, trips in timings)
+        lines.append("%-8s %7d %8.2f %8.2f %8.2f %8.2f %8.2f" % (name,
+            len(timings), percentile(latencies, 50),
+            percentile(latencies, 95), percentile(latencies, 99),
+            latencies[-1], trips / float(len(timings))))
+
+    for name in sorted(results['errors']):
+        for error, count in sorted(results['errors'][name].items()):
+            lines.append("%-8s %7d errors  %s" % (name, count, error))
+
+    return "\n".join(lines)
+
+def percentile(values, pct):
+    """Gets a percentile using the nearest-rank method.
+
+    values - A sorted List of numbers.
+    pct    - The Integer percentile.
+
+    Returns a number.
+    """
+
+    index = int(round(pct / 100.0 * len(values))) - 1
+    return values[min(max(index, 0), len(values) - 1)]
+
+def zipf_cdf(count, skew):
+    """Builds the cumulative distribution of a Zipf distribution.
+
+    count - The Integer number of ranks.
+    skew  - The Float exponent.
+
+    Returns a List of Floats.
+    """
+
+    weights = [1.0 / (rank ** skew) for rank in xrange(1, count + 1)]
+    total = sum(weights)
+    cdf = []
+    running = 0.0
+    for weight in weights:
+        running += weight
+        cdf.append(running / total)
+    cdf[-1] = 1.0
+    return cdf
+
+def pick(rand, cdf):
+    """Picks an index from a cumulative distribution.
+
+    rand - A random.Random.
+    cdf  - A List of Floats from zipf_cdf() or similar.
+
+    Returns an Integer index, starting at 0 for the first entry of cdf.
+    """
+
+    return bisect.bisect_left(cdf, rand.random())
@@ -0,0 +1,32 @@
+from lists import rebuild
+
+from optparse import OptionParser
+
+# Rebuilds the timestamp index column families from the messages and
+# threads rows.  Stop writes first.
+#
+#   python rebuild_indexes.py --keyspace liststest --dry-run
+#   python rebuild_indexes.py --keyspace liststest --processes 8
+
+parser = OptionParser()
+parser.add_option("--keyspace", default="liststest")
+parser.add_option("--server", action="append", dest="servers",
+    help="host:port of a Cassandra node.  Repeat for more nodes.")
+parser.add_option("--dry-run", action="store_true", default=False,
+    help="only report the drift")
+parser.add_option("--splits", type="int", default=16,
+    help="token ranges to scan each column family in")
+parser.add_option("--processes", type="int", default=4)
+parser.add_option("--batch-size", type="int", default=1000)
+options, args = parser.parse_args()
+
+kwargs = {}
+if options.servers:
+    kwargs['server_list'] = options.servers
+
+keyspace = rebuild.Keyspace(options.keyspace, **kwargs)
+drift = rebuild.rebuild(keyspace, dry_run=options.dry_run,
+    splits=options.splits, processes=options.processes,
+    batch_size=options.batch_size)
+
+print rebuild.report(drift)
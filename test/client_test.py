@@ -0,0 +1,228 @@
+from ..lists import client, entities, memory
+
+from datetime import timedelta
+from time import sleep
+from nose.tools import assert_equal
+from pycassa import ConsistencyLevel, NotFoundException
+
+ONE, QUORUM, ALL = (ConsistencyLevel.ONE, ConsistencyLevel.QUORUM,
+    ConsistencyLevel.ALL)
+
+class RecordingColumnFamily(memory.MemoryColumnFamily):
+    """Records the consistency level of every call, and leaves the `stale`
+    rows out of multigets at ONE like a replica that hasn't caught up."""
+
+    def __init__(self, pool, name):
+        super(RecordingColumnFamily, self).__init__(pool, name)
+        self.calls = []
+        self.stale = set()
+        pool.recorded[name] = self
+
+    def get(self, key, **kwargs):
+        self.record('get', [key], kwargs)
+        return super(RecordingColumnFamily, self).get(key, **kwargs)
+
+    def multiget(self, keys, **kwargs):
+        self.record('multiget', keys, kwargs)
+        rows = super(RecordingColumnFamily, self).multiget(keys, **kwargs)
+        if kwargs.get('read_consistency_level') == ONE:
+            for key in self.stale:
+                rows.pop(key, None)
+        return rows
+
+    def insert(self, key, columns, **kwargs):
+        self.record('insert', [key], kwargs)
+        super(RecordingColumnFamily, self).insert(key, columns, **kwargs)
+
+    def record(self, name, keys, kwargs):
+        self.calls.append((name, list(keys),
+            kwargs.get('read_consistency_level',
+                kwargs.get('write_consistency_level'))))
+
+def recording_client(**kwargs):
+    pool = memory.MemoryPool()
+    pool.recorded = {}
+    c = client.Client("liststest", pool=pool,
+        column_family=RecordingColumnFamily, **kwargs)
+    return (c, pool.recorded)
+
+def post(c, thread, count):
+    msgs = []
+    for i in xrange(count):
+        msgs.append(c.msg(thread, title="Message %d" % i))
+        c.messages.save(msgs[-1])
+        sleep(0.01)
+    return msgs
+
+def test_read_options():
+    assert_equal({}, client.read_options(None))
+    assert_equal({'read_consistency_level': ConsistencyLevel.QUORUM},
+        client.read_options(ConsistencyLevel.QUORUM))
+    assert_equal({'read_consistency_level': ConsistencyLevel.ONE},
+        client.read_options(client.FAST_READ))
+
+def test_merge_rows():
+    a, b, c = entities._uuid(), entities._uuid(), entities._uuid()
+    keys = [a.bytes, b.bytes, c.bytes]
+    fast = {a: {'title': 'a'}}
+    retried = {c: {'title': 'c'}}
+
+    rows = client.merge_rows(keys, fast, retried)
+    assert_equal([(a, {'title': 'a'}), (c, {'title': 'c'})], rows)
+
+    rows = client.merge_rows(keys + [a.bytes, c.bytes], fast, retried)
+    assert_equal([(a, {'title': 'a'}), (c, {'title': 'c'})], rows)
+
+def test_previews():
+    c = client.Client("liststest", pool=memory.MemoryPool(),
+        column_family=memory.MemoryColumnFamily)
+    lst = c.list("foo@bar.com")
+    quiet, busy = c.thread(lst, "quiet"), c.thread(lst, "busy")
+    c.threads.save(quiet)
+    c.threads.save(busy)
+
+    msgs = []
+    for i in xrange(3):
+        msgs.append(c.msg(busy, title="Busy %d" % i))
+        c.messages.save(msgs[-1])
+        sleep(0.01)
+
+    previews = c.threads.previews([quiet, busy, "foo@bar.com/empty"], 2)
+    assert_equal(["quiet", "busy", "empty"],
+        [thread.key for thread, previewed in previews])
+    assert_equal([], previews[0][1])
+    assert_equal([msgs[2].key, msgs[1].key],
+        [msg.key for msg in previews[1][1]])
+    assert_equal([], previews[2][1])
+
+def test_fast_read_retries_missing_rows():
+    c, fams = recording_client()
+    thread = c.thread("foo@bar.com", "yay")
+    c.threads.save(thread)
+    first, second = post(c, thread, 2)
+
+    fams['messages'].stale.add(first.key.bytes)
+    fams['messages'].calls = []
+    fams['thread_messages'].calls = []
+
+    msgs = c.threads.messages(thread, client.FAST_READ)
+    assert_equal([second.key, first.key], [msg.key for msg in msgs])
+    assert_equal([('get', [thread.key], ONE)],
+        fams['thread_messages'].calls)
+    assert_equal([
+        ('multiget', [second.key.bytes, first.key.bytes], ONE),
+        ('multiget', [first.key.bytes], QUORUM)],
+        fams['messages'].calls)
+
+def test_fast_read_without_missing_rows():
+    c, fams = recording_client(fallback_consistency_level=ALL)
+    thread = c.thread("foo@bar.com", "yay")
+    c.threads.save(thread)
+    msg, = post(c, thread, 1)
+
+    fams['messages'].calls = []
+    keys = [msg.key.bytes, msg.key.bytes]
+    msgs = c.messages.multiget(keys, client.FAST_READ)
+    assert_equal([msg.key], [found.key for found in msgs])
+    assert_equal([('multiget', keys, ONE)], fams['messages'].calls)
+
+def test_fast_read_retries_repeated_keys_once():
+    c, fams = recording_client()
+    thread = c.thread("foo@bar.com", "yay")
+    c.threads.save(thread)
+    msg, = post(c, thread, 1)
+
+    fams['messages'].stale.add(msg.key.bytes)
+    msgs = c.messages.multiget([msg.key.bytes, msg.key.bytes],
+        client.FAST_READ)
+    assert_equal([msg.key], [found.key for found in msgs])
+
+def test_read_consistency_overrides():
+    c, fams = recording_client(read_consistency_level=QUORUM)
+    lst = c.list("foo@bar.com", name="Foo")
+    c.lists.save(lst)
+    thread = c.thread(lst, "yay")
+    c.threads.save(thread)
+    msg, = post(c, thread, 1)
+
+    c.lists.get(lst.key)
+    c.lists.get(lst.key, ALL)
+    assert_equal([QUORUM, ALL],
+        [level for name, keys, level in fams['lists'].calls if name == 'get'])
+
+    c.lists.threads(lst, ONE)
+    assert_equal(('get', [lst.key], ONE), fams['list_threads'].calls[-1])
+    assert_equal(('multiget', [thread.key], ONE), fams['threads'].calls[-1])
+
+    c.lists.messages(lst)
+    assert_equal(('get', [lst.key], QUORUM),
+        fams['list_messages'].calls[-1])
+    assert_equal(('multiget', [msg.key.bytes], QUORUM),
+        fams['messages'].calls[-1])
+
+    c.threads.get(thread.key, ALL)
+    assert_equal(('get', [thread.key], ALL), fams['threads'].calls[-1])
+    c.messages.get(msg.key, ONE)
+    assert_equal(('get', [msg.key.bytes], ONE), fams['messages'].calls[-1])
+
+def test_write_consistency_level():
+    c, fams = recording_client(write_consistency_level=ALL)
+    thread = c.thread("foo@bar.com", "yay")
+    c.threads.save(thread)
+    post(c, thread, 1)
+
+    for name in ('threads', 'messages', 'thread_messages', 'list_messages',
+            'list_threads'):
+        assert_equal(set([ALL]), set(level for call, keys, level
+            in fams[name].calls if call == 'insert'))
+
+def test_empty_rows():
+    c = client.Client("liststest", pool=memory.MemoryPool(),
+        column_family=memory.MemoryColumnFamily)
+    lst = c.list("foo@bar.com")
+    thread = c.thread(lst, "yay")
+
+    assert_equal(None, c.lists.get(lst.key))
+    assert_equal(None, c.threads.get(thread.key))
+    assert_equal([], c.lists.threads(lst))
+    assert_equal([], c.lists.messages(lst))
+    assert_equal([], c.threads.messages(thread))
+
+def test_previews_cleans_up_dupes():
+    pool = memory.MemoryPool()
+    c = client.Client("liststest", pool=pool,
+        column_family=memory.MemoryColumnFamily)
+    thread = c.thread("foo@bar.com", "busy")
+    c.threads.save(thread)
+    msgs = post(c, thread, 3)
+
+    th_msgs = pool.column_family('thread_messages')
+    dupe = (msgs[2].updated_at - timedelta(microseconds=1), msgs[2].key)
+    th_msgs.insert(thread.key, {dupe: ''})
+
+    previews = c.threads.previews([thread, "foo@bar.com/busy"], 2,
+        client.FAST_READ)
+    assert_equal(1, len(previews))
+    assert_equal([msgs[2].key, msgs[1].key],
+        [msg.key for msg in previews[0][1]])
+    assert_equal(3, len(th_msgs.get(thread.key)))
+    assert_equal(False, dupe in th_msgs.get(thread.key))
+
+class EmptyColumnFamily(object):
+    """Raises NotFoundException for every row, like an empty index row."""
+
+    def get(self, key, **kwargs):
+        raise NotFoundException()
+
+class StubClient(object):
+    read_consistency_level = None
+    write_consistency_level = None
+
+def test_empty_index_rows():
+    empty = EmptyColumnFamily()
+    assert_equal([], client.get_unique_msg_keys(empty, "foo@bar.com"))
+
+    lists = client.ListClient(StubClient(), empty, empty, empty)
+    assert_equal(None, lists.get("foo@bar.com"))
+    threads = client.ThreadClient(StubClient(), empty, empty, empty)
+    assert_equal(None, threads.get("yay"))
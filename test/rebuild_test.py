@@ -0,0 +1,132 @@
+from ..lists import client, entities, memory, rebuild
+
+from datetime import datetime
+from nose.tools import assert_equal, assert_raises
+
+class FailingColumnFamily(memory.MemoryColumnFamily):
+    """Fails inserts into the column family named by the pool's `fail`."""
+
+    def insert(self, key, columns, **kwargs):
+        if self.name == getattr(self.pool, 'fail', None):
+            raise IOError("%s insert failed" % self.name)
+        super(FailingColumnFamily, self).insert(key, columns, **kwargs)
+
+def test_token_ranges():
+    ranges = rebuild.token_ranges(4)
+    assert_equal(("-1", str(2 ** 125)), ranges[0])
+    assert_equal(str(2 ** 127), ranges[-1][1])
+
+    for key in ("foo@bar.com", "yay", "\x00" * 16):
+        token = memory.token(key)
+        assert_equal(1, len([r for r in ranges
+            if int(r[0]) < token <= int(r[1])]))
+
+def test_rebuild():
+    pool = memory.MemoryPool()
+    c = client.Client("liststest", pool=pool,
+        column_family=memory.MemoryColumnFamily)
+    lst = c.list("foo@bar.com")
+    thread = c.thread(lst, "yay")
+    c.threads.save(thread)
+    first, second = c.msg(thread, title="First"), c.msg(thread, title="Two")
+    c.messages.save(first)
+    c.messages.save(second)
+
+    # a leftover dupe, a missing entry, and a stale row
+    list_msgs = pool.column_family('list_messages')
+    list_msgs.insert(lst.key, {(datetime(2010, 1, 1), first.key): ''})
+    pool.column_family('thread_messages').remove(thread.key,
+        [(second.updated_at, second.key)])
+    pool.column_family('list_threads').insert("gone", {
+        (datetime(2010, 1, 1), "gone"): ''})
+
+    drift = rebuild.rebuild(pool, dry_run=True, splits=4, processes=0)
+    assert_equal({'rows': 1, 'drifted': 1, 'missing': 0, 'extra': 1,
+        'skipped': 0},
+        drift['list_messages'])
+    assert_equal({'rows': 1, 'drifted': 1, 'missing': 1, 'extra': 0,
+        'skipped': 0},
+        drift['thread_messages'])
+    # the second save also left the thread's older entry in list_threads
+    assert_equal({'rows': 2, 'drifted': 2, 'missing': 0, 'extra': 2,
+        'skipped': 0},
+        drift['list_threads'])
+    assert_equal({'rows': 1, 'drifted': 0, 'missing': 0, 'extra': 0,
+        'skipped': 0},
+        drift['threads'])
+
+    rebuild.rebuild(pool, splits=4, processes=0)
+    drift = rebuild.rebuild(pool, dry_run=True, splits=4, processes=0)
+    for name in rebuild.INDEXES:
+        assert_equal(0, drift[name]['drifted'])
+    assert_equal(None, rebuild.keyspace)
+
+    assert_equal([second.key, first.key],
+        [msg.key for msg in c.threads.messages(thread)])
+
+def test_rebuild_partial_save():
+    pool = memory.MemoryPool()
+    c = client.Client("liststest", pool=pool,
+        column_family=FailingColumnFamily)
+    lst = c.list("foo@bar.com")
+    thread = c.thread(lst, "yay")
+    c.threads.save(thread)
+    first = c.msg(thread, title="First")
+    c.messages.save(first)
+    old_updated = thread.message_updated_at
+
+    # the second save stops at the threads insert, before the List indexes
+    second = c.msg(thread, title="Second")
+    pool.fail = 'threads'
+    assert_raises(IOError, c.messages.save, second)
+    pool.fail = None
+
+    drift = rebuild.rebuild(pool, dry_run=True, splits=4, processes=0)
+    assert_equal({'rows': 1, 'drifted': 1, 'missing': 1, 'extra': 0,
+        'skipped': 0},
+        drift['list_messages'])
+    assert_equal(0, drift['thread_messages']['drifted'])
+    assert_equal({'rows': 1, 'drifted': 1, 'missing': 1, 'extra': 1,
+        'skipped': 0},
+        drift['list_threads'])
+    assert_equal({'rows': 1, 'drifted': 1, 'missing': 1, 'extra': 0,
+        'skipped': 0},
+        drift['threads'])
+    assert_equal(old_updated,
+        c.threads.get(thread.key).message_updated_at)
+
+    rebuild.rebuild(pool, splits=4, processes=0)
+    drift = rebuild.rebuild(pool, dry_run=True, splits=4, processes=0)
+    for name in rebuild.INDEXES + ('threads',):
+        assert_equal(0, drift[name]['drifted'])
+
+    assert_equal(second.updated_at,
+        c.threads.get(thread.key).message_updated_at)
+    assert_equal([(second.updated_at, thread.key)],
+        pool.column_family('list_threads').get(lst.key).keys())
+    assert_equal([second.key, first.key],
+        [msg.key for msg in c.lists.messages(lst)])
+
+def test_rebuild_skips_incomplete_rows():
+    pool = memory.MemoryPool()
+    c = client.Client("liststest", pool=pool,
+        column_family=memory.MemoryColumnFamily)
+    # saving a Message to an unsaved Thread leaves a threads row with only
+    # `message_updated_at`
+    msg = c.msg(c.thread("foo@bar.com", "unsaved"), title="Orphan")
+    c.messages.save(msg)
+    pool.column_family('messages').insert(entities._uuid().bytes,
+        {'title': 'Torn'})
+
+    drift = rebuild.rebuild(pool, dry_run=True, splits=4, processes=0)
+    assert_equal({'rows': 0, 'drifted': 0, 'missing': 0, 'extra': 0,
+        'skipped': 1}, drift['threads'])
+    assert_equal(2, drift['messages']['rows'])
+    assert_equal(1, drift['messages']['skipped'])
+    assert_equal(0, drift['thread_messages']['drifted'])
+    assert_equal(1, drift['list_threads']['extra'])
+    assert "skipped" in rebuild.report(drift)
+
+    rebuild.rebuild(pool, splits=4, processes=0)
+    assert_equal([msg.key], [m.key for m in c.lists.messages(msg.thread.list)])
+    assert_equal([], c.lists.threads(msg.thread.list))
@@ -0,0 +1,88 @@
+from ..lists import workload
+
+import threading
+from StringIO import StringIO
+from nose.tools import assert_equal, assert_true
+
+def test_zipf_cdf():
+    cdf = workload.zipf_cdf(3, 1.0)
+    assert_equal(3, len(cdf))
+    assert_equal(1.0, cdf[-1])
+    assert_true(cdf[0] > cdf[1] - cdf[0] > cdf[2] - cdf[1])
+
+def test_operations():
+    spec = workload.Workload(lists=3, threads=5, seed=1)
+    ops = list(spec.operations(200))
+    assert_equal(200, len(ops))
+    assert_equal(ops, list(workload.Workload(lists=3, threads=5,
+        seed=1).operations(200)))
+
+    posted = set()
+    for op in ops:
+        if op[0] == "post":
+            posted.add(op[1:])
+        elif op[0] == "edit":
+            assert_true(op[1:] in posted)
+
+def test_record_and_replay():
+    ops = list(workload.Workload(seed=2).operations(20))
+    trace = StringIO()
+    workload.record(ops, trace)
+    trace.seek(0)
+    assert_equal(ops, list(workload.replay(trace)))
+
+def test_run_in_memory():
+    spec = workload.Workload(lists=2, threads=3, seed=3)
+    ops = list(spec.operations(100))
+    c, counter = workload.client(memory=True)
+    workload.prepare(c, ops)
+
+    results = workload.run(c, ops, counter, concurrency=4)
+    assert_equal({}, results['errors'])
+    assert_equal(100, sum(len(t) for t in results['ops'].values()))
+    assert_equal(5, results['ops']['post'][0][1])
+
+def test_run_records_errors_and_ran_operations():
+    c, counter = workload.client(memory=True)
+
+    def broken(lst, **kwargs):
+        raise ValueError("boom")
+    c.lists.threads = broken
+
+    ops = [("edit", "list-1@example.com", "thread-1"),
+        ("list", "list-1@example.com")]
+    results = workload.run(c, ops, counter)
+    assert_equal({'list': {'ValueError: boom': 1}}, results['errors'])
+    assert_equal(['post'], results['ops'].keys())
+    assert_true('ValueError: boom' in workload.report(results))
+
+def test_prepare_keeps_threads_in_their_list():
+    spec = workload.Workload(lists=3, threads=4, seed=4)
+    ops = list(spec.operations(200))
+    c, counter = workload.client(memory=True)
+    workload.prepare(c, ops)
+
+    for op in ops:
+        workload.perform(c, op, {}, threading.Lock())
+
+    for rank in xrange(1, 4):
+        key = spec.list_key(rank)
+        threads = c.lists.threads(key)
+        assert_true(threads)
+        assert_equal(set([key]), set(thread.list.key for thread in threads))
+
+def test_replay_prepares_traced_threads():
+    trace = StringIO()
+    workload.record(workload.Workload(lists=20, threads=30,
+        seed=5).operations(300), trace)
+    trace.seek(0)
+    ops = list(workload.replay(trace))
+
+    c, counter = workload.client(memory=True)
+    workload.prepare(c, ops)
+    results = workload.run(c, ops, counter)
+    assert_equal({}, results['errors'])
+
+    for op in ops:
+        if len(op) > 2:
+            assert_equal(op[1], c.threads.get(op[2]).list.key)